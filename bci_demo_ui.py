@@ -7,24 +7,68 @@ Hardware: ADS1299 -> ESP32 (UDP) -> PC
 """
 
 import sys
+import math
+import time
+import random
 import numpy as np
-from collections import deque
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QLabel, QPushButton, QLineEdit,
                              QGroupBox, QGridLayout)
 from PyQt6.QtCore import QThread, pyqtSignal, QTimer, Qt
 from PyQt6.QtGui import QFont, QPalette, QColor
 import pyqtgraph as pg
+from scipy import fft as sp_fft
+
+try:
+    import pyfftw  # 可选：有 pyFFTW 时复用 FFTW 计划
+except ImportError:
+    pyfftw = None
+
+try:
+    from numba import njit  # 可选：有 Numba 时编译模拟数据生成
+except ImportError:
+    njit = None
+
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def synthesize_eeg_into(ring, start, t, freq_alpha, freq_beta, noise):
+        """生成一批模拟 EEG 并直接写入环形缓冲区 (自动处理回绕)"""
+        n_channels, ring_size = ring.shape
+        two_pi = 2 * math.pi
+        for ch in range(n_channels):
+            for i in range(t.size):
+                ring[ch, (start + i) % ring_size] = (
+                    math.sin(two_pi * freq_alpha[ch] * t[i]) * 20 +
+                    math.sin(two_pi * freq_beta[ch] * t[i]) * 10 +
+                    noise[ch, i] * 5)
+else:
+    synthesize_eeg_into = None
+
+
+# 类别指示器样式表模板
+CLASS_INDICATOR_STYLE = """
+    font-size: 48px;
+    font-weight: bold;
+    color: {color};
+    background-color: #1a1e2e;
+    border-radius: 10px;
+    padding: 20px;
+"""
 
 
 class DataSimulatorThread(QThread):
     """数据模拟线程 - 未来替换为 UDP 接收线程"""
 
-    # 信号：发送模拟的 EEG 数据和推理结果
-    new_data = pyqtSignal(np.ndarray)  # 8通道 EEG 数据
+    # 信号：通知新的 EEG 数据已写入共享环形缓冲区，以及推理结果
+    new_data = pyqtSignal(int)  # 累计写入的样本数
     new_inference = pyqtSignal(np.ndarray)  # [left_prob, right_prob]
 
-    def __init__(self):
+    def __init__(self, eeg_ring):
+        """
+        参数:
+            eeg_ring: 共享环形缓冲区 (n_channels, ring_size)，由本线程单独写入
+        """
         super().__init__()
         self.running = False
         self.sample_rate = 250  # Hz (ADS1299 典型采样率)
@@ -33,30 +77,62 @@ class DataSimulatorThread(QThread):
         self.inference_counter = 0
         self.current_class = 0  # 0=左手, 1=右手
 
+        # 每个通道的主频率（列向量，便于广播）
+        # 主频率在 8-13 Hz (Alpha波段) 和 13-30 Hz (Beta波段)
+        ch_idx = np.arange(self.n_channels, dtype=np.float32)[:, None]
+        self.freq_alpha = 10 + ch_idx * 0.5  # Alpha
+        self.freq_beta = 20 + ch_idx * 1.0   # Beta
+        self.rng = np.random.default_rng()
+
+        # 数据直接写入共享环形缓冲区，跨线程只传递累计样本数
+        self.eeg_ring = eeg_ring
+        self.ring_size = eeg_ring.shape[1]
+        self.samples_written = 0
+        self.batch_size = 5   # 每次生成5个样本点 (每 20ms 一批，即 250 Hz)
+        self.emit_size = 10   # 每写入10个样本点通知一次 (25 Hz，高于界面 20 Hz 刷新率)
+        self.period = self.batch_size / self.sample_rate  # 每批数据的时长 (秒)
+        # 一批样本相对于批起点的时间偏移 (秒)
+        self.batch_times = np.arange(self.batch_size) / self.sample_rate
+        self.last_emitted = 0
+
     def run(self):
         """运行数据模拟"""
         self.running = True
+        deadline = time.monotonic()
 
         while self.running:
             # === 1. 模拟 8 通道 EEG 数据 ===
-            # 生成一批数据 (每次10个样本点)
-            batch_size = 10
-            t = np.linspace(self.time, self.time + batch_size/self.sample_rate, batch_size)
-
-            # 为每个通道生成不同频率的正弦波 + 噪声
-            eeg_data = np.zeros((self.n_channels, batch_size))
-            for ch in range(self.n_channels):
-                # 主频率在 8-13 Hz (Alpha波段) 和 13-30 Hz (Beta波段)
-                freq1 = 10 + ch * 0.5  # Alpha
-                freq2 = 20 + ch * 1.0  # Beta
-
-                signal = (np.sin(2 * np.pi * freq1 * t) * 20 +
-                         np.sin(2 * np.pi * freq2 * t) * 10 +
-                         np.random.randn(batch_size) * 5)  # 噪声
-
-                eeg_data[ch, :] = signal
-
-            self.new_data.emit(eeg_data)
+            # 生成一批数据 (每次5个样本点)
+            batch_size = self.batch_size
+            # 相位保持 float64 计算，避免长时间运行后 float32 时间精度不足
+            t = self.batch_times + self.time
+            noise = self.rng.standard_normal((self.n_channels, batch_size))
+            start = self.samples_written % self.ring_size
+
+            if synthesize_eeg_into is not None:
+                # Numba 编译版本：生成与写入环形缓冲区在一个循环内完成
+                synthesize_eeg_into(self.eeg_ring, start, t,
+                                    self.freq_alpha[:, 0], self.freq_beta[:, 0], noise)
+            else:
+                # 为每个通道生成不同频率的正弦波 + 噪声 (一次广播得到 8×batch_size)
+                t = t[None, :]
+                eeg_data = (np.sin(2 * np.pi * self.freq_alpha * t) * 20 +
+                            np.sin(2 * np.pi * self.freq_beta * t) * 10 +
+                            noise * 5)  # 噪声
+
+                # 写入环形缓冲区（跨越末尾时拆成两段切片）
+                end = start + batch_size
+                if end <= self.ring_size:
+                    self.eeg_ring[:, start:end] = eeg_data
+                else:
+                    split = self.ring_size - start
+                    self.eeg_ring[:, start:] = eeg_data[:, :split]
+                    self.eeg_ring[:, :end - self.ring_size] = eeg_data[:, split:]
+            self.samples_written += batch_size
+
+            if self.samples_written - self.last_emitted >= self.emit_size:
+                self.new_data.emit(self.samples_written)
+                self.last_emitted = self.samples_written
             self.time += batch_size / self.sample_rate
 
             # === 2. 模拟推理结果 ===
@@ -66,22 +142,29 @@ class DataSimulatorThread(QThread):
                 self.current_class = 1 - self.current_class
 
             # 生成概率值（带一些随机波动）
+            # 两个标量用 Python 运算即可，比构造小 NumPy 数组开销更低
             if self.current_class == 0:  # 左手
-                left_prob = 0.7 + np.random.randn() * 0.1
-                right_prob = 0.3 + np.random.randn() * 0.1
+                left_prob = 0.7 + random.gauss(0, 0.1)
+                right_prob = 0.3 + random.gauss(0, 0.1)
             else:  # 右手
-                left_prob = 0.3 + np.random.randn() * 0.1
-                right_prob = 0.7 + np.random.randn() * 0.1
+                left_prob = 0.3 + random.gauss(0, 0.1)
+                right_prob = 0.7 + random.gauss(0, 0.1)
 
             # 归一化到 [0, 1] 并确保和为1
-            probs = np.array([left_prob, right_prob])
-            probs = np.clip(probs, 0.05, 0.95)
-            probs = probs / probs.sum()
+            left_prob = min(0.95, max(0.05, left_prob))
+            right_prob = min(0.95, max(0.05, right_prob))
+            total = left_prob + right_prob
+            probs = np.array([left_prob / total, right_prob / total], dtype=np.float32)
 
             self.new_inference.emit(probs)
 
-            # 控制更新频率 (20ms 约等于 50 FPS)
-            self.msleep(20)
+            # 控制更新频率 (20ms 即 50 FPS)：按绝对截止时间睡眠，避免累积漂移
+            deadline += self.period
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                self.msleep(int(delay * 1000))
+            else:
+                deadline = time.monotonic()  # 落后太多时重新对齐，不追赶
 
     def stop(self):
         """停止线程"""
@@ -99,16 +182,45 @@ class BCIMainWindow(QMainWindow):
         # 数据缓冲区
         self.n_channels = 8
         self.buffer_size = 1000  # 显示最近1000个点
-        self.eeg_buffers = [deque(maxlen=self.buffer_size) for _ in range(self.n_channels)]
-        self.time_buffer = deque(maxlen=self.buffer_size)
+        # 预分配环形缓冲区，由数据线程直接写入 (单写单读)
+        # 额外预留 1 秒余量，读取显示窗口时不会与正在写入的样本重叠
+        self.ring_size = self.buffer_size + 250
+        self.eeg_ring = np.zeros((self.n_channels, self.ring_size), dtype=np.float32)
+        # 固定的相对时间轴 (秒)，通过曲线位置偏移显示绝对时间
+        self.time_axis = np.arange(self.buffer_size, dtype=np.float32) / 250
+        self.samples_written = 0  # 数据线程已写入的累计样本数
+        self.n_filled = 0         # 显示窗口内的有效样本数
         self.time_counter = 0
 
-        # 频谱数据缓冲
-        self.spectrogram_buffer = deque(maxlen=100)
+        # 频谱计算常量：窗函数、频率轴和 0-50 Hz 掩码只需计算一次
+        self.fft_size = 256
+        self.fft_window = np.hanning(self.fft_size).astype(np.float32)
+        fft_freq = sp_fft.rfftfreq(self.fft_size, 1/250)
+        if pyfftw is not None:
+            self.rfft = pyfftw.builders.rfft(np.empty(self.fft_size, dtype=np.float32))
+        else:
+            self.rfft = sp_fft.rfft
+
+        self.fft_freq_mask = fft_freq <= 50
+        self.fft_freq = fft_freq[self.fft_freq_mask]
+
+        # 频谱数据缓冲：最近 100 帧频谱，预分配的二维环形缓冲区 (帧 × 频率)
+        self.spectrogram_buffer = np.zeros((100, len(self.fft_freq)), dtype=np.float32)
+        self.spectrogram_idx = 0
 
         # 推理结果
         self.inference_probs = np.array([0.5, 0.5])
 
+        # 类别指示器样式表（预先生成，类别变化时才应用）
+        self.style_left = CLASS_INDICATOR_STYLE.format(color='#ff4444')
+        self.style_right = CLASS_INDICATOR_STYLE.format(color='#4444ff')
+        self.last_class = None
+
+        # 刷新节拍：波形 20 Hz，频谱每 4 帧 (5 Hz)，状态文本每 20 帧 (1 Hz)
+        self.tick = 0
+        self.spectrum_every = 4
+        self.status_every = 20
+
         # 数据模拟线程
         self.data_thread = None
         self.is_connected = False
@@ -125,6 +237,13 @@ class BCIMainWindow(QMainWindow):
         pg.setConfigOption('background', '#0a0e27')
         pg.setConfigOption('foreground', '#00ff88')
 
+        # 波形绘制加速：有 PyOpenGL 时用 OpenGL 绘制曲线，关闭抗锯齿
+        try:
+            import OpenGL  # noqa: F401
+            pg.setConfigOptions(useOpenGL=True, enableExperimental=True, antialias=False)
+        except ImportError:
+            pg.setConfigOptions(antialias=False)
+
         # 设置应用程序样式
         self.setStyleSheet("""
             QMainWindow {
@@ -257,32 +376,36 @@ class BCIMainWindow(QMainWindow):
         group = QGroupBox("原始脑电信号 (8 通道)")
         layout = QVBoxLayout()
 
-        # 创建 pyqtgraph 绘图窗口
-        self.eeg_plot_widget = pg.GraphicsLayoutWidget()
+        # 创建 pyqtgraph 绘图窗口：所有通道画在同一个坐标系中，按通道纵向偏移
+        self.eeg_plot_widget = pg.PlotWidget()
+        self.eeg_plot_widget.setBackground('#0a0e27')
+        self.eeg_plot_widget.setLabel('bottom', '时间 (s)', color='#00ff88')
+        self.eeg_plot_widget.showGrid(x=True, y=True, alpha=0.3)
+        self.eeg_plot_widget.setMouseEnabled(x=False, y=False)
 
-        # 创建 8 个子图
-        self.eeg_plots = []
         self.eeg_curves = []
 
         channel_names = ['Fp1', 'Fp2', 'C3', 'C4', 'P3', 'P4', 'O1', 'O2']
         colors = ['#00ff88', '#00ffff', '#ffff00', '#ff8800',
                  '#ff00ff', '#8800ff', '#ff0088', '#88ff00']
 
-        for i in range(self.n_channels):
-            plot = self.eeg_plot_widget.addPlot(row=i, col=0)
-            plot.setLabel('left', channel_names[i], color='#00ff88')
-            plot.showGrid(x=True, y=True, alpha=0.3)
-            plot.setYRange(-50, 50)
-            plot.setMouseEnabled(x=False, y=False)
-
-            # 隐藏除了最后一个图之外的 x 轴
-            if i < self.n_channels - 1:
-                plot.getAxis('bottom').setStyle(showValues=False)
-            else:
-                plot.setLabel('bottom', '时间 (s)', color='#00ff88')
+        # 每个通道占 100 µV 高度 (原子图纵轴范围 -50~50)，第一个通道在最上方
+        self.channel_spacing = 100
+        self.channel_offsets = [(self.n_channels - 1 - i) * self.channel_spacing
+                                for i in range(self.n_channels)]
+        self.eeg_plot_widget.setYRange(-self.channel_spacing / 2,
+                                       self.channel_offsets[0] + self.channel_spacing / 2,
+                                       padding=0)
+        self.eeg_plot_widget.getAxis('left').setTicks(
+            [[(offset, name) for offset, name in zip(self.channel_offsets, channel_names)]]
+        )
 
-            curve = plot.plot(pen=pg.mkPen(color=colors[i], width=1.5))
-            self.eeg_plots.append(plot)
+        for i in range(self.n_channels):
+            curve = self.eeg_plot_widget.plot(pen=pg.mkPen(color=colors[i], width=1.5))
+            # 只绘制可见范围内的点，并按像素做峰值降采样
+            curve.setDownsampling(auto=True, method='peak')
+            curve.setClipToView(True)
+            curve.setPos(0, self.channel_offsets[i])
             self.eeg_curves.append(curve)
 
         layout.addWidget(self.eeg_plot_widget)
@@ -297,14 +420,7 @@ class BCIMainWindow(QMainWindow):
         # 类别指示器（大标题）
         self.class_indicator = QLabel("待检测")
         self.class_indicator.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.class_indicator.setStyleSheet("""
-            font-size: 48px;
-            font-weight: bold;
-            color: #00ff88;
-            background-color: #1a1e2e;
-            border-radius: 10px;
-            padding: 20px;
-        """)
+        self.class_indicator.setStyleSheet(CLASS_INDICATOR_STYLE.format(color='#00ff88'))
         layout.addWidget(self.class_indicator)
 
         # 概率柱状图
@@ -408,16 +524,19 @@ class BCIMainWindow(QMainWindow):
 
             # 启动数据模拟线程
             # TODO: 替换为真实的 UDP 接收线程
-            self.data_thread = DataSimulatorThread()
-            self.data_thread.new_data.connect(self.on_new_eeg_data)
-            self.data_thread.new_inference.connect(self.on_new_inference)
+            self.samples_written = 0
+            self.n_filled = 0
+            self.data_thread = DataSimulatorThread(self.eeg_ring)
+            self.data_thread.new_data.connect(
+                self.on_new_eeg_data, Qt.ConnectionType.QueuedConnection)
+            self.data_thread.new_inference.connect(
+                self.on_new_inference, Qt.ConnectionType.QueuedConnection)
             self.data_thread.start()
 
             self.is_connected = True
 
             # 2秒后重新启用按钮（允许断开）
-            QTimer.singleShot(2000, lambda: self.connect_btn.setEnabled(True))
-            QTimer.singleShot(2000, lambda: self.connect_btn.setText("🔌 断开连接"))
+            QTimer.singleShot(2000, self.finalize_connection)
         else:
             # 断开连接
             if self.data_thread:
@@ -432,48 +551,43 @@ class BCIMainWindow(QMainWindow):
             self.model_label.setText("模型: CTNet (未加载)")
             self.is_connected = False
 
-    def on_new_eeg_data(self, data):
-        """接收新的 EEG 数据"""
-        # data shape: (n_channels, batch_size)
-        batch_size = data.shape[1]
+    def finalize_connection(self):
+        """连接建立后重新启用按钮（允许断开）"""
+        self.connect_btn.setEnabled(True)
+        self.connect_btn.setText("🔌 断开连接")
 
-        # 更新缓冲区
-        for i in range(batch_size):
-            self.time_buffer.append(self.time_counter)
-            self.time_counter += 1/250  # 假设采样率 250 Hz
+    def on_new_eeg_data(self, samples_written):
+        """接收新的 EEG 数据 (数据已由线程写入环形缓冲区)"""
+        self.samples_written = samples_written
+        self.n_filled = min(self.buffer_size, samples_written)
+        self.time_counter = samples_written / 250  # 假设采样率 250 Hz
 
-            for ch in range(self.n_channels):
-                self.eeg_buffers[ch].append(data[ch, i])
+    def get_ordered_buffer(self):
+        """按时间顺序返回显示窗口内的 EEG 数据"""
+        end = self.samples_written % self.ring_size
+        start = end - self.n_filled
+        if start >= 0:
+            # 窗口在缓冲区内连续，直接返回视图
+            return self.eeg_ring[:, start:end]
 
-        # 更新采样率显示
-        self.samples_label.setText("采样率: 250 Hz")
+        # 窗口跨越缓冲区末尾，拼接两段
+        return np.concatenate((self.eeg_ring[:, start:], self.eeg_ring[:, :end]), axis=1)
 
     def on_new_inference(self, probs):
         """接收新的推理结果"""
         # TODO: 替换为真实的 CTNet 模型推理
         self.inference_probs = probs
 
-        # 更新类别指示器
-        if probs[0] > probs[1]:
-            self.class_indicator.setText("← 左手")
-            self.class_indicator.setStyleSheet("""
-                font-size: 48px;
-                font-weight: bold;
-                color: #ff4444;
-                background-color: #1a1e2e;
-                border-radius: 10px;
-                padding: 20px;
-            """)
-        else:
-            self.class_indicator.setText("右手 →")
-            self.class_indicator.setStyleSheet("""
-                font-size: 48px;
-                font-weight: bold;
-                color: #4444ff;
-                background-color: #1a1e2e;
-                border-radius: 10px;
-                padding: 20px;
-            """)
+        # 更新类别指示器（仅在类别变化时重设样式表，避免频繁解析）
+        cls = 0 if probs[0] > probs[1] else 1
+        if cls != self.last_class:
+            if cls == 0:
+                self.class_indicator.setText("← 左手")
+                self.class_indicator.setStyleSheet(self.style_left)
+            else:
+                self.class_indicator.setText("右手 →")
+                self.class_indicator.setStyleSheet(self.style_right)
+            self.last_class = cls
 
         # 更新置信度
         confidence = max(probs) * 100
@@ -481,39 +595,53 @@ class BCIMainWindow(QMainWindow):
 
     def update_plots(self):
         """更新所有图表"""
-        if not self.is_connected or len(self.time_buffer) == 0:
+        if not self.is_connected or self.n_filled == 0:
             return
 
-        # 更新 EEG 波形
-        time_array = np.array(self.time_buffer)
+        # 按时间顺序展开环形缓冲区
+        eeg_array = self.get_ordered_buffer()
+
+        # 更新 EEG 波形：x 轴复用固定时间轴，用曲线位置表示窗口起始时间和通道偏移
+        time_array = self.time_axis[:self.n_filled]
+        window_start = self.time_counter - self.n_filled / 250
         for ch in range(self.n_channels):
-            data_array = np.array(self.eeg_buffers[ch])
-            self.eeg_curves[ch].setData(time_array, data_array)
+            self.eeg_curves[ch].setData(time_array, eeg_array[ch])
+            self.eeg_curves[ch].setPos(window_start, self.channel_offsets[ch])
 
         # 更新推理概率柱状图
         self.prob_bargraph.setOpts(
             height=self.inference_probs.tolist()
         )
 
-        # 更新频谱图（使用第一个通道的数据）
-        if len(self.eeg_buffers[0]) >= 256:
-            data = np.array(list(self.eeg_buffers[0])[-256:])
+        self.tick += 1
+
+        # 更新频谱图（使用第一个通道的数据，5 Hz）
+        if self.tick % self.spectrum_every == 0 and self.n_filled >= self.fft_size:
+            data = eeg_array[0, -self.fft_size:]
 
             # 计算 FFT
-            fft_vals = np.fft.rfft(data * np.hanning(len(data)))
-            fft_freq = np.fft.rfftfreq(len(data), 1/250)
+            fft_vals = self.rfft(data * self.fft_window)
             fft_power = 20 * np.log10(np.abs(fft_vals) + 1e-10)
 
             # 只显示 0-50 Hz
-            freq_mask = fft_freq <= 50
-            self.spectrum_curve.setData(fft_freq[freq_mask], fft_power[freq_mask])
+            band_power = fft_power[self.fft_freq_mask]
+            self.spectrum_curve.setData(self.fft_freq, band_power)
+
+            # 记录到频谱缓冲区
+            self.spectrogram_buffer[self.spectrogram_idx] = band_power
+            self.spectrogram_idx = (self.spectrogram_idx + 1) % len(self.spectrogram_buffer)
+
+        # 状态文本每秒更新一次 (1 Hz)
+        if self.tick % self.status_every == 0:
+            # 更新 FPS
+            self.fps_label.setText(f"FPS: {1000//50}")
 
-        # 更新 FPS
-        self.fps_label.setText(f"FPS: {1000//50}")
+            # 更新采样率显示
+            self.samples_label.setText("采样率: 250 Hz")
 
-        # 更新数据包计数
-        packet_count = int(self.time_counter * 250 / 10)
-        self.packets_label.setText(f"数据包: {packet_count}")
+            # 更新数据包计数
+            packet_count = int(self.time_counter * 250 / 10)
+            self.packets_label.setText(f"数据包: {packet_count}")
 
 
 def main():
@@ -6,8 +6,8 @@ BCI Competition IV Data Set 2b - Motor Imagery Experiment
 只实现核心的 Motor Imagery Screening 流程
 """
 
-import random
-import time
+import functools
+import sys
 import numpy as np
 
 # 必须在导入 psychopy.sound 之前设置音频后端
@@ -15,7 +15,7 @@ from psychopy import prefs
 prefs.hardware['audioLib'] = ['pygame']
 
 from psychopy import visual, core, event, sound
-from pylsl import StreamInfo, StreamOutlet
+from pylsl import StreamInfo, StreamOutlet, local_clock
 
 
 # ============================================================================
@@ -32,6 +32,11 @@ MARKER_RIGHT_HAND = 770   # 右手运动想象提示
 TRIALS_PER_RUN = 20       # 每个 Run 包含 20 个 Trial
 TRIALS_PER_CLASS = 10     # 每类 10 个 Trial (左手/右手各10个)
 
+# Trial 类别 (整数标签，作为提示刺激/Marker 查找表的下标)
+CLASS_LEFT = 0
+CLASS_RIGHT = 1
+CLASS_NAMES = ('left', 'right')
+
 # 时序参数 (单位: 秒)
 TIME_FIXATION = 3.0       # 0-3s: 十字光标显示时间
 TIME_CUE_DURATION = 1.25  # 3-4.25s: 提示箭头显示时长
@@ -42,6 +47,7 @@ TIME_REST_RANDOM = 1.0    # 休息随机增量 (0-1s)
 # 提示音参数 (参考原文档: 1kHz, 70ms)
 BEEP_FREQUENCY = 1000     # Hz
 BEEP_DURATION = 0.07      # 秒
+BEEP_SAMPLE_RATE = 22050  # Hz
 
 # 视觉参数
 FIXATION_SIZE = 0.5       # 十字光标大小
@@ -50,11 +56,52 @@ BACKGROUND_COLOR = 'black'
 FOREGROUND_COLOR = 'white'
 
 
+# ============================================================================
+# 提示音生成
+# ============================================================================
+@functools.lru_cache(maxsize=8)
+def _build_beep(sample_rate=BEEP_SAMPLE_RATE, frequency=BEEP_FREQUENCY, duration=BEEP_DURATION):
+    """
+    生成提示音波形 (int16 单声道)
+
+    按 (采样率, 频率, 时长) 缓存波形（含汉宁窗），多次创建实验对象时复用
+
+    参数:
+        sample_rate: 采样率 (Hz)
+        frequency: 提示音频率 (Hz)
+        duration: 提示音时长 (秒)
+    """
+    n_samples = int(sample_rate * duration)
+    # 全程使用 float32 计算 (精度对 16 位音频足够)
+    t = np.linspace(0, duration, n_samples, dtype=np.float32)
+    wave = np.sin(np.float32(2 * np.pi * frequency) * t)
+
+    # 乘汉宁窗（平滑开始和结束，避免爆音），再缩放并转换为 int16
+    wave *= np.hanning(n_samples).astype(np.float32)
+    wave *= np.float32(32767)
+    return wave.astype(np.int16)
+
+
+# 导入时生成一次提示音波形
+# (以位置参数调用，与混音器实际采样率相同时 __init__ 可命中同一缓存项)
+BEEP_WAVE = _build_beep(BEEP_SAMPLE_RATE)
+
+
 class MotorImageryExperiment:
     """运动想象实验类"""
 
-    def __init__(self):
-        """初始化实验环境"""
+    # pygame 提示音对象，多个实验对象之间共享
+    _beep_sound = None
+
+    def __init__(self, seed=None):
+        """
+        初始化实验环境
+
+        参数:
+            seed: 随机数种子 (Trial 顺序和休息时长)，None 表示不固定
+        """
+
+        self.rng = np.random.default_rng(seed)
 
         print("[INFO] 正在初始化实验环境...")
 
@@ -71,6 +118,17 @@ class MotorImageryExperiment:
         print("[INFO] 窗口创建成功（窗口模式）")
         print("[INFO] 提示：可将窗口拖到外接显示器，然后点击窗口左上角绿色按钮全屏")
 
+        # 测量屏幕刷新率，各阶段时长换算为帧数 (由 win.flip() 的垂直同步计时)
+        frame_rate = self.win.getActualFrameRate()
+        if frame_rate is None:
+            frame_rate = 60.0
+            print("[WARNING] 无法测量刷新率，按 60 Hz 计算")
+        self.frame_rate = frame_rate
+        self.n_frames_fixation = round(TIME_FIXATION * frame_rate)
+        self.n_frames_cue = round(TIME_CUE_DURATION * frame_rate)
+        self.n_frames_imagery = round(TIME_IMAGERY * frame_rate)
+        print(f"[INFO] 屏幕刷新率: {frame_rate:.1f} Hz")
+
         # === 2. 创建视觉刺激 ===
         print("[INFO] 创建视觉刺激...")
         # 十字光标 (Fixation Cross)
@@ -105,6 +163,33 @@ class MotorImageryExperiment:
             text='',
             color=BACKGROUND_COLOR
         )
+
+        # 准备界面、倒计时数字和结束界面 (预先创建，避免运行时重复生成纹理)
+        self.ready_text = visual.TextStim(
+            self.win,
+            text='运动想象实验\n\n准备开始...\n\n按任意键开始',
+            height=0.08,
+            color=FOREGROUND_COLOR
+        )
+        self.countdown = {
+            i: visual.TextStim(
+                self.win,
+                text=str(i),
+                height=0.2,
+                color=FOREGROUND_COLOR
+            )
+            for i in (3, 2, 1)
+        }
+        self.end_text = visual.TextStim(
+            self.win,
+            text='实验完成！\n\n感谢您的参与\n\n按任意键退出',
+            height=0.08,
+            color=FOREGROUND_COLOR
+        )
+
+        # 按类别标签索引的提示刺激和 Marker
+        self.cues = (self.cue_left, self.cue_right)
+        self.cue_markers = (MARKER_LEFT_HAND, MARKER_RIGHT_HAND)
         print("[INFO] 视觉刺激创建完成")
 
         # === 3. 创建听觉刺激 ===
@@ -113,26 +198,19 @@ class MotorImageryExperiment:
         try:
             # 方案1: 尝试使用 pygame 生成正弦波
             import pygame
-            pygame.mixer.init(frequency=22050, size=-16, channels=1, buffer=512)
-
-            # 生成 1kHz 正弦波
-            sample_rate = 22050
-            duration = BEEP_DURATION
-            frequency = BEEP_FREQUENCY
-
-            import numpy as np
-            t = np.linspace(0, duration, int(sample_rate * duration))
-            wave = np.sin(2 * np.pi * frequency * t)
-
-            # 应用汉宁窗（平滑开始和结束，避免爆音）
-            window = np.hanning(len(wave))
-            wave = wave * window
-
-            # 转换为 pygame 可用的格式
-            wave = (wave * 32767).astype(np.int16)
-            stereo_wave = np.repeat(wave.reshape(-1, 1), 2, axis=1)
-
-            self.beep = pygame.sndarray.make_sound(stereo_wave)
+            pygame.mixer.init(frequency=BEEP_SAMPLE_RATE, size=-16, channels=1, buffer=512)
+
+            # 1kHz 正弦波 (导入时已生成，Sound 对象只创建一次)
+            if MotorImageryExperiment._beep_sound is None:
+                # 混音器可能已由 PsychoPy 以其他参数初始化，按实际采样率/声道数生成
+                mixer_rate, _, mixer_channels = pygame.mixer.get_init()
+                wave = _build_beep(mixer_rate)
+                if mixer_channels > 1:
+                    # 多声道：广播视图 + 一次连续拷贝 (不使用 np.repeat)
+                    wave = np.ascontiguousarray(
+                        np.broadcast_to(wave[:, None], (wave.size, mixer_channels)))
+                MotorImageryExperiment._beep_sound = pygame.sndarray.make_sound(wave)
+            self.beep = MotorImageryExperiment._beep_sound
             print("[INFO] 提示音创建成功 (pygame)")
 
         except Exception as e:
@@ -161,76 +239,112 @@ class MotorImageryExperiment:
             source_id='psychopy_mi_experiment'
         )
         self.outlet = StreamOutlet(info)
+        # 实时路径上不直接打印：日志行和 (marker, LSL 时间戳) 先缓存，休息期间统一输出
+        self.log_buffer = []
+        self.marker_log = []
 
         print("[INFO] LSL Stream 'PsychopyMarkers' 已创建")
         print(f"[INFO] 实验参数: {TRIALS_PER_RUN} Trials/Run, 左右手各 {TRIALS_PER_CLASS} 个")
 
     def send_marker(self, marker):
-        """发送 LSL Marker"""
-        self.outlet.push_sample([marker])
-        print(f"[MARKER] {marker} 已发送 (时间戳: {time.time():.3f})")
+        """发送 LSL Marker (实时路径上不打印，只记录)"""
+        timestamp = local_clock()
+        self.outlet.push_sample([marker], timestamp)
+        self.marker_log.append((marker, timestamp))
+
+    def flush_log(self):
+        """一次性输出并清空缓存的日志行和 Marker 记录"""
+        lines = self.log_buffer + [
+            f"[MARKER] {marker} 已发送 (LSL 时间戳: {timestamp:.3f})"
+            for marker, timestamp in self.marker_log
+        ]
+        if lines:
+            sys.stdout.write('\n'.join(lines) + '\n')
+            sys.stdout.flush()
+        self.log_buffer.clear()
+        self.marker_log.clear()
+
+    def play_beep(self):
+        """播放提示音（支持 pygame.Sound 或系统铃声）"""
+        if self.beep is None:
+            return
+        if callable(self.beep):
+            self.beep()  # 系统铃声（lambda 函数）
+        else:
+            self.beep.play()  # pygame Sound 对象
+
+    def quit_on_escape(self):
+        """按下 ESC 时清理资源并退出"""
+        if event.getKeys(keyList=['escape']):
+            self.cleanup()
+            core.quit()
+
+    def hold(self, stim, n_frames, poll_escape=False):
+        """
+        持续显示刺激 n_frames 帧 (每帧 flip 都等待垂直同步)
 
-    def run_trial(self, trial_type):
+        参数:
+            stim: 要绘制的视觉刺激
+            n_frames: 帧数
+            poll_escape: 是否每帧检查 ESC 退出
+        """
+        for _ in range(n_frames):
+            stim.draw()
+            self.win.flip()
+            if poll_escape:
+                self.quit_on_escape()
+
+    def run_trial(self, label):
         """
         运行单次 Trial
 
         参数:
-            trial_type: 'left' 或 'right'
+            label: CLASS_LEFT (0) 或 CLASS_RIGHT (1)
         """
 
+        # 清空上一个 Trial 残留的按键事件
+        event.clearEvents('keyboard')
+
         # === t = 0s: 十字光标 + 提示音 + Marker 768 ===
         # (参考 BCI IV-2b Figure 3a)
+        # 提示音和 Marker 挂在 flip 上，与屏幕实际刷新同时发出
         self.fixation.draw()
+        self.win.callOnFlip(self.play_beep)
+        self.win.callOnFlip(self.send_marker, MARKER_TRIAL_START)
         self.win.flip()
-        if self.beep is not None:
-            # 播放提示音（支持 pygame.Sound 或系统铃声）
-            if callable(self.beep):
-                self.beep()  # 系统铃声（lambda 函数）
-            else:
-                self.beep.play()  # pygame Sound 对象
-        self.send_marker(MARKER_TRIAL_START)
 
-        # 等待 3 秒
-        core.wait(TIME_FIXATION)
+        # 等待 3 秒 (首帧已显示)
+        self.hold(self.fixation, self.n_frames_fixation - 1)
 
         # 检查是否按下 ESC 退出
-        if 'escape' in event.getKeys():
-            self.cleanup()
-            core.quit()
+        self.quit_on_escape()
 
         # === t = 3s: 显示提示箭头 (Cue) ===
-        # 根据 Trial 类型显示左箭头 (<) 或右箭头 (>)
-        if trial_type == 'left':
-            self.cue_left.draw()
-            self.win.flip()
-            self.send_marker(MARKER_LEFT_HAND)
-        else:  # right
-            self.cue_right.draw()
-            self.win.flip()
-            self.send_marker(MARKER_RIGHT_HAND)
+        # 根据 Trial 类别显示左箭头 (<) 或右箭头 (>)
+        cue = self.cues[label]
+        cue.draw()
+        self.win.callOnFlip(self.send_marker, self.cue_markers[label])
+        self.win.flip()
 
-        # 提示显示 1.25 秒
-        core.wait(TIME_CUE_DURATION)
+        # 提示显示 1.25 秒 (首帧已显示)
+        self.hold(cue, self.n_frames_cue - 1)
 
         # === t = 4.25s ~ 8s: 运动想象阶段 ===
         # 提示消失，保留十字光标，受试者进行运动想象
-        self.fixation.draw()
-        self.win.flip()
-        core.wait(TIME_IMAGERY)
+        self.hold(self.fixation, self.n_frames_imagery)
 
         # === t = 8s: 空白屏幕 + 休息 ===
         # 屏幕变黑
         self.blank.draw()
         self.win.flip()
 
-        # 随机休息时间: 1.5s + random(0, 1.0)s
-        rest_time = TIME_REST_BASE + random.random() * TIME_REST_RANDOM
-        core.wait(rest_time)
+        # 休息期间输出本 Trial 的日志，不占用刺激呈现时间
+        self.flush_log()
 
-        # 检查退出
-        if 'escape' in event.getKeys():
-            self.cleanup()
-            core.quit()
+        # 随机休息时间: 1.5s + random(0, 1.0)s
+        rest_time = TIME_REST_BASE + self.rng.random() * TIME_REST_RANDOM
+        # 逐帧刷新空白屏幕并检查 ESC，休息期间也能及时退出
+        self.hold(self.blank, round(rest_time * self.frame_rate) - 1, poll_escape=True)
 
     def run_experiment(self):
         """
@@ -238,61 +352,51 @@ class MotorImageryExperiment:
         """
 
         # === 1. 生成 Trial 序列 (10个左手 + 10个右手，随机打乱) ===
-        trial_sequence = (
-            ['left'] * TRIALS_PER_CLASS +
-            ['right'] * TRIALS_PER_CLASS
+        trial_sequence = self.rng.permutation(
+            np.repeat([CLASS_LEFT, CLASS_RIGHT], TRIALS_PER_CLASS).astype(np.int8)
         )
-        random.shuffle(trial_sequence)
 
-        print(f"\n[INFO] Trial 序列已生成: {trial_sequence}")
+        print(f"\n[INFO] Trial 序列已生成: {[CLASS_NAMES[label] for label in trial_sequence]}")
         print(f"[INFO] 按 'Escape' 可随时退出实验\n")
 
         # === 2. 显示准备界面 ===
-        ready_text = visual.TextStim(
-            self.win,
-            text='运动想象实验\n\n准备开始...\n\n按任意键开始',
-            height=0.08,
-            color=FOREGROUND_COLOR
-        )
-        ready_text.draw()
+        self.ready_text.draw()
         self.win.flip()
         event.waitKeys()  # 等待按键
 
         # === 3. 开始倒计时 ===
         for i in range(3, 0, -1):
-            countdown = visual.TextStim(
-                self.win,
-                text=str(i),
-                height=0.2,
-                color=FOREGROUND_COLOR
-            )
-            countdown.draw()
+            self.countdown[i].draw()
             self.win.flip()
             core.wait(1.0)
 
         # === 4. 执行所有 Trials ===
-        for trial_idx, trial_type in enumerate(trial_sequence, start=1):
-            print(f"\n{'='*60}")
-            print(f"[Trial {trial_idx}/{TRIALS_PER_RUN}] 类型: {trial_type.upper()}")
-            print(f"{'='*60}")
+        # 只在 Trial 期间统计丢帧 (等待按键和倒计时的长间隔不计入)
+        self.win.nDroppedFrames = 0
+        self.win.recordFrameIntervals = True
+        for trial_idx, label in enumerate(trial_sequence, start=1):
+            self.log_buffer.extend([
+                f"\n{'='*60}",
+                f"[Trial {trial_idx}/{TRIALS_PER_RUN}] 类型: {CLASS_NAMES[label].upper()}",
+                f"{'='*60}",
+            ])
 
-            self.run_trial(trial_type)
+            self.run_trial(label)
+
+        self.win.recordFrameIntervals = False
 
         # === 5. 实验结束 ===
-        end_text = visual.TextStim(
-            self.win,
-            text='实验完成！\n\n感谢您的参与\n\n按任意键退出',
-            height=0.08,
-            color=FOREGROUND_COLOR
-        )
-        end_text.draw()
+        self.end_text.draw()
         self.win.flip()
         event.waitKeys()
 
         print("\n[INFO] 实验已完成")
+        print(f"[INFO] 丢帧数: {self.win.nDroppedFrames}")
 
     def cleanup(self):
         """清理资源"""
+        # 中途退出时输出尚未打印的日志和 Marker 记录
+        self.flush_log()
         print("\n[INFO] 正在清理资源...")
         self.win.close()
 
@@ -8,7 +8,8 @@ import matplotlib.pyplot as plt
 
 # Read the EDF file
 edf_file = 'edf_test/sub-007_ses-1_task-picture_ieeg.edf'
-raw = mne.io.read_raw_edf(edf_file, preload=True)
+# preload=False: only the header is read here, data is read on demand
+raw = mne.io.read_raw_edf(edf_file, preload=False)
 
 # Set channel types to iEEG (SEEG or ECoG)
 # This helps MNE understand this is intracranial data
@@ -42,7 +43,7 @@ raw.plot(duration=10, n_channels=30, scalings='auto',
 
 # Plot the power spectral density
 print("\nGenerating power spectral density plot...")
-raw.compute_psd(fmax=500).plot(average=True, picks='seeg',
+raw.compute_psd(fmax=500, picks='seeg').plot(average=True, picks='seeg',
                                 amplitude=False, spatial_colors=False)
 
 # Keep the plots open
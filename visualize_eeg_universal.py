@@ -9,6 +9,7 @@ import matplotlib.pyplot as plt
 import numpy as np
 import sys
 import os
+from collections import Counter
 
 def visualize_eeg_file(file_path, show_events=True, duration=10, n_channels=None):
     """
@@ -36,17 +37,18 @@ def visualize_eeg_file(file_path, show_events=True, duration=10, n_channels=None
     print(f"Detected file format: {file_ext}")
 
     # Load data based on format
+    # (preload=False: only header is read here, data is read on demand)
     print(f"\nLoading data from: {file_path}")
     try:
         if file_ext == '.edf':
-            raw = mne.io.read_raw_edf(file_path, preload=True)
+            raw = mne.io.read_raw_edf(file_path, preload=False)
         elif file_ext == '.gdf':
-            raw = mne.io.read_raw_gdf(file_path, preload=True)
+            raw = mne.io.read_raw_gdf(file_path, preload=False)
         elif file_ext == '.fif':
-            raw = mne.io.read_raw_fif(file_path, preload=True)
+            raw = mne.io.read_raw_fif(file_path, preload=False)
         else:
             print(f"Trying to load as generic format...")
-            raw = mne.io.read_raw(file_path, preload=True)
+            raw = mne.io.read_raw(file_path, preload=False)
     except Exception as e:
         print(f"Error loading file: {e}")
         return
@@ -61,14 +63,13 @@ def visualize_eeg_file(file_path, show_events=True, duration=10, n_channels=None
     print(f"Duration: {raw.times[-1]:.2f} seconds ({raw.times[-1]/60:.2f} minutes)")
     print(f"Sampling frequency: {raw.info['sfreq']} Hz")
     print(f"Number of channels: {len(raw.ch_names)}")
-    print(f"Data shape: {raw.get_data().shape}")
+    print(f"Data shape: ({len(raw.ch_names)}, {raw.n_times})")
 
     # Channel information
     ch_types = raw.get_channel_types()
-    unique_types = set(ch_types)
-    print(f"\nChannel types: {unique_types}")
-    for ch_type in unique_types:
-        count = ch_types.count(ch_type)
+    ch_type_counts = Counter(ch_types)
+    print(f"\nChannel types: {set(ch_type_counts)}")
+    for ch_type, count in ch_type_counts.items():
         print(f"  - {ch_type}: {count} channels")
 
     print(f"\nChannel names:")
@@ -82,7 +83,10 @@ def visualize_eeg_file(file_path, show_events=True, duration=10, n_channels=None
     events = None
     event_id = None
 
-    if show_events:
+    if show_events and 'stim' not in ch_types:
+        # Without a stim channel find_events can only fail - skip the scan
+        print("\nNo stim channel found - skipping event search")
+    elif show_events:
         try:
             # Try to find events in the data
             events = mne.find_events(raw, stim_channel='auto', verbose=False)
@@ -93,8 +97,8 @@ def visualize_eeg_file(file_path, show_events=True, duration=10, n_channels=None
                 print("="*70)
                 print(f"Found {len(events)} events")
 
-                # Show unique event types
-                unique_events = np.unique(events[:, 2])
+                # Show unique event types (counted in the same pass)
+                unique_events, event_counts = np.unique(events[:, 2], return_counts=True)
                 print(f"\nEvent types (IDs): {unique_events}")
 
                 # For BCI Competition IV 2b, common event IDs:
@@ -117,8 +121,7 @@ def visualize_eeg_file(file_path, show_events=True, duration=10, n_channels=None
                 }
 
                 print("\nEvent breakdown:")
-                for event_type in unique_events:
-                    count = np.sum(events[:, 2] == event_type)
+                for event_type, count in zip(unique_events, event_counts):
                     meaning = event_meanings.get(event_type, "Unknown")
                     print(f"  ID {event_type:4d}: {count:4d} occurrences - {meaning}")
 
@@ -238,8 +241,12 @@ def visualize_eeg_file(file_path, show_events=True, duration=10, n_channels=None
         else:
             fmax = 50   # Scalp EEG typically up to 50Hz
 
-        raw.compute_psd(fmax=fmax).plot(average=True, picks=plot_picks,
-                                         amplitude=False, spatial_colors=False)
+        # Load only the displayed channels, stored as float32 - plenty for
+        # a PSD and halves memory
+        psd_raw = raw.copy().pick(plot_picks).load_data()
+        psd_raw.apply_function(lambda x: x, dtype=np.float32)
+        psd_raw.compute_psd(fmax=fmax).plot(average=True, picks='all',
+                                             amplitude=False, spatial_colors=False)
     except Exception as e:
         print(f"   Could not plot PSD: {e}")
 
@@ -7,44 +7,52 @@ import mne
 import pyxdf
 import numpy as np
 import matplotlib.pyplot as plt
+from operator import itemgetter
 
 # Load XDF file
 xdf_file = 'block_Default.xdf'
 print(f"Loading XDF file: {xdf_file}\n")
 
-data, header = pyxdf.load_xdf(xdf_file)
-
-# Identify EEG and marker streams
-eeg_stream = None
-marker_stream = None
-
-for stream in data:
-    stream_type = stream['info']['type'][0]
-    if stream_type.lower() == 'eeg':
-        eeg_stream = stream
-    elif stream_type.lower() == 'markers':
-        marker_stream = stream
-
-if eeg_stream is None:
+# Only the EEG stream is needed for the PSD - let pyxdf skip all other
+# streams' sample chunks, and linearize the EEG clock while loading.
+# The stream is picked from the file headers by id, since pyxdf's own type
+# filter is case-sensitive
+eeg_ids = [s['stream_id'] for s in pyxdf.resolve_streams(xdf_file)
+           if s['type'].lower() == 'eeg']
+if not eeg_ids:
     print("Error: No EEG stream found!")
     exit(1)
 
+data, header = pyxdf.load_xdf(xdf_file,
+                              select_streams=eeg_ids,
+                              synchronize_clocks=True,
+                              dejitter_timestamps=True)
+
+eeg_stream = data[-1]  # the last EEG stream, as before
+
 # Extract EEG data
-eeg_data = eeg_stream['time_series'].T  # MNE expects (channels, samples)
+time_series = eeg_stream['time_series']
 eeg_timestamps = eeg_stream['time_stamps']
 sfreq = float(eeg_stream['info']['nominal_srate'][0])
 
 # Check data range to determine units
-data_max = np.abs(eeg_data).max()
-print(f"\nData range: {eeg_data.min():.2f} to {eeg_data.max():.2f}")
+# (min/max reductions only - no temporary abs() copy of the data)
+data_min = time_series.min()
+data_max_value = time_series.max()
+data_max = max(-data_min, data_max_value)
+print(f"\nData range: {data_min:.2f} to {data_max_value:.2f}")
 print(f"Maximum absolute value: {data_max:.2f}")
 
+# MNE expects (channels, samples): transpose into one contiguous float64
+# buffer (the dtype RawArray uses), so the conversion below can run in place
+eeg_data = np.ascontiguousarray(time_series.T, dtype=np.float64)
+
 # Convert to Volts if data is in microvolts
 # MNE expects data in Volts, and will display in µV automatically
 if data_max > 1:  # Data is likely in microvolts
     print("→ Data appears to be in microvolts (µV)")
     print("→ Converting to Volts for MNE...")
-    eeg_data = eeg_data * 1e-6  # Convert µV to V
+    eeg_data *= 1e-6  # Convert µV to V (in place)
 else:
     print("→ Data appears to be in Volts")
 
@@ -62,7 +70,8 @@ try:
         desc = eeg_stream['info']['desc'][0]
         if desc is not None and 'channels' in desc:
             channels = desc['channels'][0]['channel']
-            ch_names = [ch['label'][0] for ch in channels]
+            # ch['label'][0] for every channel, with the lookups done in C
+            ch_names = list(map(itemgetter(0), map(itemgetter('label'), channels)))
 except:
     pass
 
@@ -94,6 +103,10 @@ else:
     print(f"  Available: {raw.ch_names}")
     print(f"  Found: {available_channels}")
 
+# Store the (picked) data as float32 - plenty for a PSD plot and halves
+# the memory traffic of the Welch FFTs (RawArray always stores float64)
+raw.apply_function(lambda x: x, dtype=np.float32)
+
 print("\n" + "="*70)
 print("POWER SPECTRAL DENSITY (PSD) - Average across 8 channels")
 print("="*70)
@@ -3,197 +3,395 @@
 Visualize XDF file with MNE (interactive viewer like GDF)
 """
 
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime, timezone
 import mne
 import pyxdf
 import numpy as np
-import matplotlib.pyplot as plt
-
-# Load XDF file
-xdf_file = 'block_Default.xdf'
-print(f"Loading XDF file: {xdf_file}\n")
-
-data, header = pyxdf.load_xdf(xdf_file)
-
-# Identify EEG and marker streams
-eeg_stream = None
-marker_stream = None
-
-for stream in data:
-    stream_type = stream['info']['type'][0]
-    if stream_type.lower() == 'eeg':
-        eeg_stream = stream
-    elif stream_type.lower() == 'markers':
-        marker_stream = stream
-
-if eeg_stream is None:
-    print("Error: No EEG stream found!")
-    exit(1)
-
-# Extract EEG data
-eeg_data = eeg_stream['time_series'].T  # MNE expects (channels, samples)
-eeg_timestamps = eeg_stream['time_stamps']
-sfreq = float(eeg_stream['info']['nominal_srate'][0])
-
-# Check data range to determine units
-data_max = np.abs(eeg_data).max()
-print(f"\nData range: {eeg_data.min():.2f} to {eeg_data.max():.2f}")
-print(f"Maximum absolute value: {data_max:.2f}")
-
-# Convert to Volts if data is in microvolts
-# MNE expects data in Volts, and will display in µV automatically
-if data_max > 1:  # Data is likely in microvolts
-    print("→ Data appears to be in microvolts (µV)")
-    print("→ Converting to Volts for MNE...")
-    eeg_data = eeg_data * 1e-6  # Convert µV to V
-else:
-    print("→ Data appears to be in Volts")
-
-print(f"\nEEG data shape: {eeg_data.shape}")
-print(f"Sampling rate: {sfreq} Hz")
-print(f"Duration: {eeg_timestamps[-1] - eeg_timestamps[0]:.2f} seconds")
-
-# Create channel names (try to get from metadata, or use defaults)
-n_channels = eeg_data.shape[0]
-ch_names = [f'Ch{i+1}' for i in range(n_channels)]
+from operator import itemgetter
+from scipy import fft as sp_fft
 
-# Try to get real channel names if available
 try:
-    if 'desc' in eeg_stream['info'] and eeg_stream['info']['desc']:
-        desc = eeg_stream['info']['desc'][0]
-        if desc is not None and 'channels' in desc:
-            channels = desc['channels'][0]['channel']
-            ch_names = [ch['label'][0] for ch in channels]
-except:
-    pass
-
-print(f"Channels: {ch_names}")
-
-# Create MNE info object
-info = mne.create_info(
-    ch_names=ch_names,
-    sfreq=sfreq,
-    ch_types='eeg'
-)
-
-# Create MNE Raw object
-raw = mne.io.RawArray(eeg_data, info)
-
-# Set the first timestamp as the start time
-raw.set_meas_date(eeg_timestamps[0])
-
-# Select only Ch2, Ch3, Ch4 for analysis
-channels_to_keep = ['Ch2', 'Ch3', 'Ch4']
-available_channels = [ch for ch in channels_to_keep if ch in raw.ch_names]
-
-if len(available_channels) == 3:
-    print(f"\n✓ Selecting channels: {available_channels}")
-    raw.pick_channels(available_channels)
-else:
-    print(f"\n⚠ Warning: Could not find all requested channels")
-    print(f"  Requested: {channels_to_keep}")
-    print(f"  Available: {raw.ch_names}")
-    print(f"  Found: {available_channels}")
-
-print("\n" + "="*70)
-print("EXTRACTING MARKERS")
-print("="*70)
-
-# Extract markers and create MNE events
-events = []
-event_id = {}
-
-if marker_stream is not None:
-    marker_data = marker_stream['time_series']
-    marker_timestamps = marker_stream['time_stamps']
-
-    print(f"\nFound {len(marker_timestamps)} markers")
-
-    # Map marker timestamps to sample indices
-    for marker, timestamp in zip(marker_data, marker_timestamps):
-        # Get marker string
-        marker_str = str(marker[0]) if isinstance(marker, (list, np.ndarray)) else str(marker)
-
-        # Convert timestamp to sample index
-        # Find the closest sample to this timestamp
-        time_diff = timestamp - eeg_timestamps[0]
-        sample_idx = int(time_diff * sfreq)
-
-        # Make sure sample is within bounds
-        if 0 <= sample_idx < eeg_data.shape[1]:
-            # MNE events format: [sample_idx, 0, event_id]
-            # Use the marker value as event_id
-            try:
-                marker_int = int(marker_str)
-            except:
-                marker_int = hash(marker_str) % 10000  # Fallback for non-integer markers
-
-            events.append([sample_idx, 0, marker_int])
-
-            # Track event types
-            if marker_str not in event_id:
-                event_id[marker_str] = marker_int
-
-    events = np.array(events)
-
-    print(f"\nEvent types found:")
-    for name, evt_id in sorted(event_id.items(), key=lambda x: x[1]):
-        count = np.sum(events[:, 2] == evt_id)
-        print(f"  '{name}' (ID {evt_id}): {count} occurrences")
-
-    # Create event descriptions for BCI Competition format
-    event_descriptions = {
-        '768': 'Trial Start',
-        '769': 'Left Hand Cue',
-        '770': 'Right Hand Cue'
-    }
-
-    print("\nEvent meanings:")
-    for name, evt_id in event_id.items():
-        desc = event_descriptions.get(name, 'Unknown')
-        print(f"  {name} = {desc}")
+    # Optional: route the PSD FFTs through FFTW when pyFFTW is installed
+    from pyfftw.interfaces import scipy_fft as fftw_backend
+except ImportError:
+    fftw_backend = None
 
+try:
+    # Optional: fused transpose + range scan compiled with Numba
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+# Marker code -> (description, plot color), BCI Competition format
+EVENT_META = {
+    '768': ('Trial Start', 'green'),
+    '769': ('Left Hand Cue', 'blue'),
+    '770': ('Right Hand Cue', 'red'),
+}
+
+# Recordings whose selected channels take more than this much RAM are
+# written to a temporary FIF file and reopened lazily, so the viewer only
+# reads the samples it is showing
+LAZY_LOAD_BYTES = 512 * 1024**2
+
+# Temporary directories holding those FIF files
+_lazy_fif_dirs = []
+
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def transpose_with_range(x, out):
+        """Copy (samples, channels) x into (channels, samples) out in one pass,
+        returning the min and max value seen, ignoring NaN (like np.nanmin /
+        np.nanmax; NaN if every sample is NaN)."""
+        n_samples, n_channels = x.shape
+        data_min = np.inf
+        data_max = -np.inf
+        for ch in prange(n_channels):
+            for i in range(n_samples):
+                v = x[i, ch]
+                out[ch, i] = v
+                if not np.isnan(v):
+                    data_min = min(data_min, v)
+                    data_max = max(data_max, v)
+        if data_min > data_max:
+            return np.nan, np.nan
+        return data_min, data_max
 else:
-    print("\nNo marker stream found!")
-    events = None
-    event_id = None
-
-print("\n" + "="*70)
-print("POWER SPECTRAL DENSITY (PSD)")
-print("="*70)
+    transpose_with_range = None
+
+
+def parse_window(value):
+    """Parse a 'start,stop' time window in seconds."""
+    try:
+        start, stop = (float(v) for v in value.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"expected START,STOP in seconds, got {value!r}")
+    if not 0 <= start < stop:
+        raise argparse.ArgumentTypeError(
+            f"window must satisfy 0 <= START < STOP, got {value!r}")
+    return start, stop
+
+
+def load_xdf_as_raw(xdf_file, picks=('Ch2', 'Ch3', 'Ch4'), window=None):
+    """
+    Load the EEG and marker streams of an XDF file into MNE
+
+    Parameters:
+    -----------
+    xdf_file : str
+        Path to the XDF file
+    picks : sequence of str
+        Channels to keep (all channels are kept if any of them is missing)
+    window : (float, float) or None
+        Only load this (start, stop) span, in seconds from the first sample
+
+    Returns:
+    --------
+    (raw, events, event_id), or None if the file has no usable EEG data.
+    events and event_id are None when there is no marker stream.
+    """
+
+    # Load XDF file
+    print(f"Loading XDF file: {xdf_file}\n")
+
+    # Only parse the EEG and marker streams; sample chunks of any other stream
+    # in the file are skipped without being decoded. The streams are picked
+    # from the file headers by id, since pyxdf's own type filter is
+    # case-sensitive
+    stream_ids = [s['stream_id'] for s in pyxdf.resolve_streams(xdf_file)
+                  if s['type'].lower() in ('eeg', 'markers')]
+    data = []
+    if stream_ids:
+        data, header = pyxdf.load_xdf(xdf_file,
+                                      select_streams=stream_ids,
+                                      synchronize_clocks=True,
+                                      dejitter_timestamps=True)
+
+    # Identify EEG and marker streams
+    eeg_stream = None
+    marker_stream = None
+
+    for stream in data:
+        stream_type = stream['info']['type'][0]
+        if stream_type.lower() == 'eeg':
+            eeg_stream = stream
+        elif stream_type.lower() == 'markers':
+            marker_stream = stream
+
+    if eeg_stream is None:
+        print("Error: No EEG stream found!")
+        return None
+
+    # Extract EEG data
+    time_series = np.asarray(eeg_stream['time_series'])  # (samples, channels)
+    eeg_timestamps = eeg_stream['time_stamps']
+
+    # Restrict to the requested window first (as views), so everything below
+    # only processes those samples; markers outside it are dropped later
+    if window is not None:
+        start, stop = window
+        lo, hi = np.searchsorted(eeg_timestamps, eeg_timestamps[0] + np.array([start, stop]))
+        if lo == hi:
+            print(f"Error: window {start}-{stop} s contains no EEG samples!")
+            return None
+        print(f"Using window {start}-{stop} s (samples {lo}-{hi})")
+        time_series = time_series[lo:hi]
+        eeg_timestamps = eeg_timestamps[lo:hi]
+
+    # Keep float32 streams in float32 until the channel selection below, so the
+    # full-width array is never held at double the recorded size
+    if (eeg_stream['info']['channel_format'][0] == 'float32'
+            and time_series.dtype != np.float32):
+        time_series = time_series.astype(np.float32)
+    t0 = float(eeg_timestamps[0])  # first and last EEG timestamps, used below
+    t_end = float(eeg_timestamps[-1])
+    sfreq = float(eeg_stream['info']['nominal_srate'][0])
+
+    # Create channel names (try to get from metadata, or use defaults)
+    n_channels = time_series.shape[1]
+    ch_names = [f'Ch{i+1}' for i in range(n_channels)]
+
+    # Try to get real channel names if available
+    try:
+        if 'desc' in eeg_stream['info'] and eeg_stream['info']['desc']:
+            desc = eeg_stream['info']['desc'][0]
+            if desc is not None and 'channels' in desc:
+                channels = desc['channels'][0]['channel']
+                # ch['label'] for every channel, with the lookups done in C;
+                # channels with an empty label keep their default name
+                labels = list(map(itemgetter('label'), channels))
+                if len(labels) == n_channels:
+                    ch_names = [lbl[0] if lbl else f'Ch{i+1}'
+                                for i, lbl in enumerate(labels)]
+                else:
+                    print(f"⚠ Warning: stream metadata lists {len(labels)} channels "
+                          f"but the data has {n_channels}, using default names")
+    except (KeyError, IndexError, TypeError) as e:
+        print(f"⚠ Warning: could not read channel labels ({e!r}), using default names")
+
+    print(f"Channels: {ch_names}")
+
+    # Select only the requested channels (Ch2, Ch3, Ch4 by default) for
+    # analysis - done on the array itself, before unit conversion and before MNE
+    # copies it, so unused channels are never touched again
+    channels_to_keep = list(picks)
+    available_channels = [ch for ch in channels_to_keep if ch in ch_names]
+
+    if len(available_channels) == len(channels_to_keep):
+        print(f"\n✓ Selecting channels: {available_channels}")
+        keep_idx = [ch_names.index(ch) for ch in available_channels]
+        time_series = time_series[:, keep_idx]
+        ch_names = available_channels
+    else:
+        print(f"\n⚠ Warning: Could not find all requested channels")
+        print(f"  Requested: {channels_to_keep}")
+        print(f"  Available: {ch_names}")
+        print(f"  Found: {available_channels}")
+
+    # MNE expects (channels, samples): transpose into one contiguous float64
+    # buffer (the dtype RawArray uses), so the conversion below can run in place.
+    # Check data range to determine units on the way
+    # (min/max reductions only - no temporary abs() copy of the data; NaN
+    # samples, e.g. from dropouts, are ignored so they can't hide the units)
+    if transpose_with_range is not None:
+        eeg_data = np.empty(time_series.shape[::-1], dtype=np.float64)
+        data_min, data_max_value = transpose_with_range(time_series, eeg_data)
+    else:
+        data_min = np.nanmin(time_series)
+        data_max_value = np.nanmax(time_series)
+        eeg_data = np.ascontiguousarray(time_series.T, dtype=np.float64)
+    data_max = max(-data_min, data_max_value)
+    print(f"\nData range: {data_min:.2f} to {data_max_value:.2f}")
+    print(f"Maximum absolute value: {data_max:.2f}")
+
+    # Convert to Volts if data is in microvolts
+    # MNE expects data in Volts, and will display in µV automatically
+    if data_max > 1:  # Data is likely in microvolts
+        print("→ Data appears to be in microvolts (µV)")
+        print("→ Converting to Volts for MNE...")
+        eeg_data *= 1e-6  # Convert µV to V (in place)
+    else:
+        print("→ Data appears to be in Volts")
+
+    print(f"\nEEG data shape: {eeg_data.shape}")
+    print(f"Sampling rate: {sfreq} Hz")
+    print(f"Duration: {t_end - t0:.2f} seconds")
+
+    # Create MNE info object
+    info = mne.create_info(
+        ch_names=ch_names,
+        sfreq=sfreq,
+        ch_types='eeg'
+    )
 
-# Compute and plot PSD
-print("\nComputing Power Spectral Density...")
-try:
-    # For EEG data, typically interested in frequencies up to 50 Hz
-    # (includes delta, theta, alpha, beta, and low gamma bands)
-    fmax = 50  # Hz
-
-    # Compute PSD using Welch's method
-    psd = raw.compute_psd(fmax=fmax)
-
-    # Plot average PSD across all channels
-    fig_psd = psd.plot(average=True, picks='eeg',
-                       amplitude=False, spatial_colors=False,
-                       show=False)
-    fig_psd.suptitle(f'Power Spectral Density: {xdf_file}', fontsize=12, fontweight='bold')
-
-    # Also plot PSD for each channel separately
-    fig_psd_channels = psd.plot(average=False, picks='eeg',
-                                amplitude=False, spatial_colors=True,
-                                show=False)
-    fig_psd_channels.suptitle(f'PSD by Channel: {xdf_file}', fontsize=12, fontweight='bold')
-
-    print("✓ PSD computed successfully")
-    print(f"  Frequency range: 0-{fmax} Hz")
-    print(f"  Number of channels: {len(ch_names)}")
-
-except Exception as e:
-    print(f"⚠ Could not compute PSD: {e}")
-
-print("\n" + "="*70)
-print("OPENING INTERACTIVE VIEWER")
-print("="*70)
-print("""
+    # Create MNE Raw object
+    raw = mne.io.RawArray(eeg_data, info)
+
+    # Set the first timestamp as the start time (converted to an aware
+    # datetime once here rather than left to MNE)
+    raw.set_meas_date(datetime.fromtimestamp(t0, tz=timezone.utc))
+
+    if eeg_data.nbytes > LAZY_LOAD_BYTES:
+        print(f"\n→ Large recording ({eeg_data.nbytes / 1024**2:.0f} MB), "
+              "caching to a temporary FIF file for lazy loading...")
+        # Kept alive until the interpreter exits; removed automatically afterwards
+        fif_dir = tempfile.TemporaryDirectory(prefix='xdf_viewer_')
+        _lazy_fif_dirs.append(fif_dir)
+        fif_path = os.path.join(fif_dir.name, 'eeg_raw.fif')
+        raw.save(fif_path, fmt='single', overwrite=True)
+        # Drop every in-memory copy of the samples, including pyxdf's own
+        del raw, eeg_data, time_series
+        eeg_stream['time_series'] = None
+        raw = mne.io.read_raw_fif(fif_path, preload=False)
+
+    print("\n" + "="*70)
+    print("EXTRACTING MARKERS")
+    print("="*70)
+
+    # Extract markers and create MNE events
+    events = []
+    event_id = {}
+
+    if marker_stream is not None:
+        marker_data = marker_stream['time_series']
+        marker_timestamps = marker_stream['time_stamps']
+
+        print(f"\nFound {len(marker_timestamps)} markers")
+
+        # Get integer marker codes. Integer streams come back from pyxdf as an
+        # (n, 1) array and are converted in one go; string markers are parsed
+        # in a single fromiter pass, falling back to one by one if some of them
+        # aren't integers
+        if isinstance(marker_data, np.ndarray) and marker_data.dtype.kind in 'iu':
+            marker_codes = marker_data[:, 0].astype(np.int64)
+            marker_names = None
+        else:
+            marker_names = [str(marker[0]) if isinstance(marker, (list, np.ndarray)) else str(marker)
+                            for marker in marker_data]
+            try:
+                # Common case: every string marker is an integer code
+                marker_codes = np.fromiter(map(int, marker_names), dtype=np.int64,
+                                           count=len(marker_names))
+            except ValueError:
+                marker_codes = np.zeros(len(marker_names), dtype=np.int64)
+                text_markers = {}  # non-integer marker -> indices where it occurs
+                for i, marker_str in enumerate(marker_names):
+                    try:
+                        marker_codes[i] = int(marker_str)
+                    except ValueError:
+                        text_markers.setdefault(marker_str, []).append(i)
+
+                # Non-integer markers get their own ids, numbered in order of first
+                # appearance above every integer code so they can't collide with one
+                next_id = max(10000, int(marker_codes.max(initial=0)) + 1)
+                for offset, indices in enumerate(text_markers.values()):
+                    marker_codes[indices] = next_id + offset
+
+        # Map all marker timestamps to sample indices at once: binary search
+        # for the last EEG sample at or before each marker. Uses the actual
+        # sample timestamps, so clock jitter or dropped samples don't shift events
+        marker_timestamps = np.asarray(marker_timestamps)
+        sample_idx = np.searchsorted(eeg_timestamps, marker_timestamps, side='right') - 1
+
+        # Make sure markers fall within the recording
+        in_range = (marker_timestamps >= t0) & (marker_timestamps <= t_end)
+
+        # MNE events format: [sample_idx, 0, event_id]
+        # Use the marker value as event_id. Filled column by column into one
+        # preallocated int64 array
+        events = np.empty((np.count_nonzero(in_range), 3), dtype=np.int64)
+        events[:, 0] = sample_idx[in_range]
+        events[:, 1] = 0
+        events[:, 2] = marker_codes[in_range]
+
+        # Track event types
+        if marker_names is None:
+            event_id = {str(code): int(code) for code in np.unique(events[:, 2])}
+        else:
+            for i in np.flatnonzero(in_range):
+                event_id.setdefault(marker_names[i], int(marker_codes[i]))
+
+        print(f"\nEvent types found:")
+        for name, evt_id in sorted(event_id.items(), key=lambda x: x[1]):
+            count = np.sum(events[:, 2] == evt_id)
+            print(f"  '{name}' (ID {evt_id}): {count} occurrences")
+
+        print("\nEvent meanings:")
+        for name, evt_id in event_id.items():
+            desc = EVENT_META.get(name, ('Unknown',))[0]
+            print(f"  {name} = {desc}")
+
+    else:
+        print("\nNo marker stream found!")
+        events = None
+        event_id = None
+
+    return raw, events, event_id
+
+
+def plot_xdf_raw(raw, events, event_id, xdf_file, psd=False):
+    """
+    Open the interactive viewer (and optionally the PSD plots) for a Raw
+    returned by load_xdf_as_raw. Does not block; call plt.show() afterwards
+
+    Parameters:
+    -----------
+    raw : mne.io.Raw
+        EEG data
+    events, event_id : ndarray, dict or None
+        MNE events and event ids
+    xdf_file : str
+        Source file name, used in the window titles
+    psd : bool
+        Whether to also compute and plot the power spectral density
+    """
+
+    # Compute and plot PSD (only when requested)
+    if psd:
+        print("\n" + "="*70)
+        print("POWER SPECTRAL DENSITY (PSD)")
+        print("="*70)
+
+        print("\nComputing Power Spectral Density...")
+        try:
+            # For EEG data, typically interested in frequencies up to 50 Hz
+            # (includes delta, theta, alpha, beta, and low gamma bands)
+            fmax = 50  # Hz
+
+            # Compute PSD using Welch's method, with the FFTs multi-threaded
+            # (and done by FFTW if available)
+            with sp_fft.set_backend(fftw_backend or 'scipy'), sp_fft.set_workers(-1):
+                spectrum = raw.compute_psd(fmax=fmax)
+
+            # Plot average PSD across all channels
+            fig_psd = spectrum.plot(average=True, picks='eeg',
+                                    amplitude=False, spatial_colors=False,
+                                    show=False)
+            fig_psd.suptitle(f'Power Spectral Density: {xdf_file}', fontsize=12, fontweight='bold')
+
+            # Also plot PSD for each channel separately
+            fig_psd_channels = spectrum.plot(average=False, picks='eeg',
+                                             amplitude=False, spatial_colors=True,
+                                             show=False)
+            fig_psd_channels.suptitle(f'PSD by Channel: {xdf_file}', fontsize=12, fontweight='bold')
+
+            print("✓ PSD computed successfully")
+            print(f"  Frequency range: 0-{fmax} Hz")
+            print(f"  Number of channels: {len(raw.ch_names)}")
+
+        except Exception as e:
+            print(f"⚠ Could not compute PSD: {e}")
+
+    print("\n" + "="*70)
+    print("OPENING INTERACTIVE VIEWER")
+    print("="*70)
+    print("""
 Controls:
   - Left/Right arrows: Navigate through time
   - Up/Down arrows: Adjust scaling
@@ -201,48 +399,66 @@ Controls:
   - Click on channel name: Hide/show channel
   - Click and drag: Scroll through data
 
-Event colors:
-  - Green: 768 (Trial Start)
-  - Blue: 769 (Left Hand Cue)
-  - Red: 770 (Right Hand Cue)
-""")
-
-# Create custom event colors
-event_color = {}
-if event_id:
-    for name, evt_id in event_id.items():
-        if name == '768':
-            event_color[evt_id] = 'green'
-        elif name == '769':
-            event_color[evt_id] = 'blue'
-        elif name == '770':
-            event_color[evt_id] = 'red'
-        else:
-            event_color[evt_id] = 'purple'
+Event colors:""")
+    for name, (desc, color) in EVENT_META.items():
+        print(f"  - {color.capitalize()}: {name} ({desc})")
+    print()
+
+    # Create custom event colors (unknown markers are shown in purple)
+    event_color = {}
+    if event_id:
+        event_color = {evt_id: EVENT_META.get(name, (None, 'purple'))[1]
+                       for name, evt_id in event_id.items()}
 
-# Plot with events
-if events is not None and len(events) > 0:
-    raw.plot(
+    # Plot with events (if any)
+    plot_kwargs = dict(
         duration=10,  # Show 10 seconds at a time
-        n_channels=3,  # Show 3 channels (Ch2, Ch3, Ch4)
+        n_channels=len(raw.ch_names),  # Show every loaded channel (Ch2, Ch3, Ch4)
         scalings='auto',
-        events=events,
-        event_id=event_id,
-        event_color=event_color,
-        title=f'XDF Data (Ch2, Ch3, Ch4): {xdf_file}',
+        title=f'XDF Data ({", ".join(raw.ch_names)}): {xdf_file}',
         block=False  # Don't block so PSD windows are also visible
     )
-else:
-    raw.plot(
-        duration=10,
-        n_channels=3,
-        scalings='auto',
-        title=f'XDF Data (Ch2, Ch3, Ch4): {xdf_file}',
-        block=False
-    )
-
-# Show all plots (PSD + interactive viewer)
-print("\n" + "="*70)
-print("All plots displayed. Close windows to exit.")
-print("="*70)
-plt.show()
+    if events is not None and len(events) > 0:
+        plot_kwargs.update(events=events, event_id=event_id, event_color=event_color)
+    raw.plot(**plot_kwargs)
+
+
+def run(xdf_file, psd=False, window=None):
+    """
+    Load an XDF file and show it until the windows are closed
+
+    Returns:
+    --------
+    True if the file was loaded and shown, False if it could not be loaded
+    """
+    # Imported here so that loading alone (load_xdf_as_raw) never pulls in
+    # pyplot; MNE imports its own matplotlib bits lazily as well
+    import matplotlib.pyplot as plt
+
+    loaded = load_xdf_as_raw(xdf_file, window=window)
+    if loaded is None:
+        return False
+    raw, events, event_id = loaded
+
+    plot_xdf_raw(raw, events, event_id, xdf_file, psd=psd)
+
+    # Show all plots (PSD + interactive viewer)
+    print("\n" + "="*70)
+    print("All plots displayed. Close windows to exit.")
+    print("="*70)
+    plt.show()
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('xdf_file', nargs='?', default='block_Default.xdf',
+                        help='XDF file to open (default: %(default)s)')
+    parser.add_argument('--psd', action='store_true',
+                        help='also compute and plot the power spectral density')
+    parser.add_argument('--window', type=parse_window, metavar='START,STOP',
+                        help='only use this part of the recording (seconds from its start)')
+    args = parser.parse_args()
+
+    if not run(args.xdf_file, psd=args.psd, window=args.window):
+        sys.exit(1)